@@ -41,7 +41,7 @@ def test_histogram():
     recency_data = [d['recency'] for d in SAMPLE_DATA]
 
     response = requests.post(
-        f"{API_URL}/api/visualize/histogram",
+        f"{API_URL}/api/visualize/histogram?inline=1",
         json={
             "data": recency_data,
             "field": "recency",
@@ -145,6 +145,49 @@ def test_comprehensive_blood_viz():
         print(f"   Error: {response.text}")
         return False
 
+def test_sparse_blood_data():
+    """Test blood data visualization with missing and null fields"""
+    print("\n6. Testing blood data with missing fields...")
+    sparse_data = [dict(d) for d in SAMPLE_DATA]
+    del sparse_data[0]['time']
+    del sparse_data[1]['class']
+    sparse_data[2]['recency'] = None
+
+    response = requests.post(
+        f"{API_URL}/api/visualize/blood-data",
+        json={
+            "data": sparse_data
+        }
+    )
+
+    if response.ok and response.json()['count'] == 4:
+        print("✅ Sparse blood data visualization generated")
+        return True
+    else:
+        print(f"❌ Sparse blood data visualization failed: {response.status_code}")
+        print(f"   Error: {response.text}")
+        return False
+
+def test_histogram_bin_edges():
+    """Test that values on a bin edge are counted like np.histogram"""
+    print("\n7. Testing histogram bin edges...")
+    import numpy as np
+    from app import _hist_stats
+
+    # Integer data on 0..12 with 20 bins puts values exactly on bin edges
+    values = np.repeat(np.arange(13, dtype=np.float64), 10)
+    counts, edges, _, _ = _hist_stats(values, 20)
+    expected, _ = np.histogram(values, bins=20)
+
+    if np.array_equal(counts, expected):
+        print("✅ Histogram counts match np.histogram")
+        return True
+    else:
+        print("❌ Histogram counts differ from np.histogram")
+        print(f"   Got:      {counts.tolist()}")
+        print(f"   Expected: {expected.tolist()}")
+        return False
+
 def main():
     print("="*60)
     print("Hodie Labs Visualization Service - Test Suite")
@@ -156,7 +199,9 @@ def main():
         test_histogram,
         test_scatter,
         test_bar_chart,
-        test_comprehensive_blood_viz
+        test_comprehensive_blood_viz,
+        test_sparse_blood_data,
+        test_histogram_bin_edges
     ]
 
     results = []